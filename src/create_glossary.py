@@ -1,33 +1,57 @@
-import pandas as pd
-import json
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import orjson
 import time
 import re
 
+from glossary_io import read_excel_cached, write_mces
+
 # --- Configuration ---
 EXCEL_FILE_PATH = 'glossary_sample.xlsx'
-OUTPUT_MCE_FILE = 'glossary_mce.json'
+OUTPUT_MCE_FILE = 'glossary_mce.json' # Only written with --dry-run
+DATAHUB_GMS_URL = 'http://localhost:8080' # Where the MCEs are emitted
+EMIT_WORKERS = 8 # Concurrent REST requests to GMS while emitting
 DATAHUB_ACTOR = 'urn:li:corpuser:datahub' # The user URN performing the ingestion
 
-def generate_urn(term_name):
-    """Generates a URN-friendly string from a term name."""
+# The only columns this script reads; everything is loaded as Arrow-backed
+# nullable strings so the column-wide string ops below run in native code
+GLOSSARY_COLUMNS = ['TermName', 'Definition', 'TermSource', 'ParentTerm']
+
+# Characters that are not allowed in a URN. Kept as a plain string: pandas only
+# hands str patterns (not compiled re.Pattern objects) to Arrow's native regex.
+_URN_PATTERN = r'[^a-zA-Z0-9_-]'
+
+def generate_urns(term_names):
+    """Generates full glossary term URNs from a Series of term names."""
     # This creates a simple, clean URN. You can adjust the logic if needed.
-    return re.sub(r'[^a-zA-Z0-9_-]', '', term_name.replace(' ', ''))
+    clean_names = (term_names.str.replace(' ', '', regex=False)
+                   .str.replace(_URN_PATTERN, '', regex=True))
+    return 'urn:li:glossaryTerm:' + clean_names
 
-def create_glossary_term_mce(row, all_terms):
+def clean_column_name(column_name):
+    """Turns an Excel header into an identifier usable as a namedtuple field."""
+    return re.sub(r'\W+', '_', str(column_name)).strip('_')
+
+def create_ownership_aspect(now_ms):
+    """Creates the Ownership aspect shared by every glossary term."""
+    return {
+        "com.linkedin.pegasus2avro.common.Ownership": {
+            "owners": [{"owner": DATAHUB_ACTOR, "type": "DATAOWNER"}],
+            "lastModified": {"time": now_ms, "actor": DATAHUB_ACTOR}
+        }
+    }
+
+def create_glossary_term_mce(term_urn, definition, term_source, parent_urn, ownership_aspect):
     """Creates a Metadata Change Event (MCE) for a single Glossary Term."""
-    term_urn = f"urn:li:glossaryTerm:{generate_urn(row['TermName'])}"
-    
     # Base structure for the GlossaryTermInfo aspect
     glossary_term_info = {
-        "definition": str(row['Definition']),
-        "termSource": str(row.get('TermSource', '')) # Safely get TermSource
+        "definition": definition,
+        "termSource": term_source
     }
 
     # Add parent node if it exists in the Excel file
-    if pd.notna(row.get('ParentTerm')):
-        parent_name = row['ParentTerm']
-        if parent_name in all_terms:
-            glossary_term_info["parentNode"] = f"urn:li:glossaryTerm:{generate_urn(parent_name)}"
+    if parent_urn is not None:
+        glossary_term_info["parentNode"] = parent_urn
 
     # Full MCE snapshot structure
     mce = {
@@ -39,12 +63,7 @@ def create_glossary_term_mce(row, all_terms):
                     {
                         "com.linkedin.pegasus2avro.glossary.GlossaryTermInfo": glossary_term_info
                     },
-                    {
-                        "com.linkedin.pegasus2avro.common.Ownership": {
-                            "owners": [{"owner": DATAHUB_ACTOR, "type": "DATAOWNER"}],
-                            "lastModified": {"time": int(time.time() * 1000), "actor": DATAHUB_ACTOR}
-                        }
-                    }
+                    ownership_aspect # Shared by every term; pre-serialised only when writing JSON
                 ]
             }
         },
@@ -52,27 +71,85 @@ def create_glossary_term_mce(row, all_terms):
     }
     return mce
 
+def emit_mces(mces, gms_url):
+    """Emits MCEs to DataHub from a pool of worker threads; returns the count emitted.
+
+    Each emit is a blocking HTTP round trip, so EMIT_WORKERS requests are kept in
+    flight over one pooled session. At most a few batches' worth of MCEs are
+    queued at a time, and the first failed request stops the run.
+    """
+    # Imported here so --dry-run does not need acryl-datahub installed
+    from datahub.emitter.rest_emitter import DatahubRestEmitter
+    from datahub.metadata.schema_classes import MetadataChangeEventClass
+
+    emitter = DatahubRestEmitter(gms_url, pool_maxsize=EMIT_WORKERS)
+    emitter.test_connection()
+    count = 0
+    with ThreadPoolExecutor(max_workers=EMIT_WORKERS) as executor:
+        pending = set()
+        for mce in mces:
+            pending.add(executor.submit(emitter.emit_mce, MetadataChangeEventClass.from_obj(mce)))
+            count += 1
+            if len(pending) >= 4 * EMIT_WORKERS:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result() # Re-raises the request's error, if any
+        for future in pending:
+            future.result()
+    return count
+
 def main():
     """Main function to read Excel and generate MCEs."""
-    all_mces = []
+    parser = argparse.ArgumentParser(description="Load glossary terms from Excel into DataHub.")
+    parser.add_argument('--dry-run', action='store_true',
+                        help=f"write the MCEs to '{OUTPUT_MCE_FILE}' instead of emitting them")
+    args = parser.parse_args()
+
+    # Every term shares one timestamp and one Ownership aspect. For the JSON
+    # file it is serialised once and spliced into each MCE as raw JSON.
+    now_ms = int(time.time() * 1000)
+    ownership_aspect = create_ownership_aspect(now_ms)
+    if args.dry_run:
+        ownership_aspect = orjson.Fragment(orjson.dumps(ownership_aspect))
     
     try:
-        glossary_df = pd.read_excel(EXCEL_FILE_PATH, sheet_name='GlossaryTerms')
-        # Create a set of all term names for quick parent lookup
-        all_term_names = set(glossary_df['TermName'])
-
-        for _, row in glossary_df.iterrows():
-            if pd.notna(row.get('TermName')):
-                mce = create_glossary_term_mce(row, all_term_names)
-                all_mces.append(mce)
-            else:
-                print(f"Skipping row due to missing 'TermName': {row}")
-
-        # Write the list of MCEs to a single JSON file
-        with open(OUTPUT_MCE_FILE, 'w') as f:
-            json.dump(all_mces, f, indent=2)
-        
-        print(f"Successfully generated {len(all_mces)} glossary term MCEs in '{OUTPUT_MCE_FILE}'")
+        glossary_df = read_excel_cached(EXCEL_FILE_PATH, GLOSSARY_COLUMNS, sheet_name='GlossaryTerms')
+        glossary_df.columns = [clean_column_name(c) for c in glossary_df.columns]
+
+        has_name = glossary_df['TermName'].notna()
+        for row in glossary_df[~has_name].itertuples(index=False, name='Row'):
+            print(f"Skipping row due to missing 'TermName': {row}")
+        glossary_df = glossary_df[has_name].reset_index(drop=True)
+
+        # Build every URN in one pass
+        glossary_df['term_urn'] = generate_urns(glossary_df['TermName'])
+        if 'ParentTerm' in glossary_df.columns:
+            # Parents not defined in the sheet (or left empty) map to NaN
+            name_to_urn = dict(zip(glossary_df['TermName'], glossary_df['term_urn']))
+            glossary_df['parent_urn'] = glossary_df['ParentTerm'].map(name_to_urn)
+        else:
+            glossary_df['parent_urn'] = None
+
+        # Empty cells would otherwise reach the JSON as <NA>
+        glossary_df['Definition'] = glossary_df['Definition'].fillna('')
+        if 'TermSource' not in glossary_df.columns:
+            glossary_df['TermSource'] = ''
+        glossary_df['TermSource'] = glossary_df['TermSource'].fillna('')
+
+        # Walk plain NumPy arrays so no per-row pandas machinery is involved;
+        # missing parents become None so the loop never calls pd.notna()
+        columns = [glossary_df[c].to_numpy(dtype=object, na_value=None)
+                   for c in ('term_urn', 'Definition', 'TermSource', 'parent_urn')]
+        mces = (create_glossary_term_mce(term_urn, definition, term_source, parent_urn, ownership_aspect)
+                for term_urn, definition, term_source, parent_urn in zip(*columns))
+
+        if args.dry_run:
+            # Stream the MCEs to a single JSON file without holding them all in memory
+            mce_count = write_mces(mces, OUTPUT_MCE_FILE)
+            print(f"Successfully generated {mce_count} glossary term MCEs in '{OUTPUT_MCE_FILE}'")
+        else:
+            mce_count = emit_mces(mces, DATAHUB_GMS_URL)
+            print(f"Successfully emitted {mce_count} glossary term MCEs to '{DATAHUB_GMS_URL}'")
 
     except FileNotFoundError:
         print(f"Error: The file '{EXCEL_FILE_PATH}' was not found.")
@@ -1,7 +1,10 @@
 import pandas as pd
-import json
+import orjson
 import time
 import re
+from functools import lru_cache
+
+from glossary_io import read_excel_cached, write_mces
 
 # =====================================================================================
 # --- Configuration ---
@@ -28,16 +31,63 @@ EXCEL_FILE_PATH = 'data_dictionary.xlsx'  # The name of your Excel file
 OUTPUT_MCE_FILE = 'generated_mce.json'
 DATAHUB_ACTOR = 'urn:li:corpuser:datahub'
 
+# Excel columns the script reads; all of them are loaded as Arrow-backed nullable strings
+DICTIONARY_COLUMNS = [
+    'Attribute/Column Name', 'Full Name', 'Definition', 'Syonym', 'List of Values',
+    'Reference Link', 'Jira Reference#', 'Originating System',
+    'physical dictionary table_name', 'DataStore1 Attribute/Column physical_name',
+    'DataStore2 Column Name',
+]
+
 
 # =====================================================================================
 # --- Helper Functions (No changes needed below this line) ---
 # =====================================================================================
 
+# The column-wide generate_urns() needs the pattern as a str: pandas falls back to
+# a per-value Python loop for compiled patterns instead of Arrow's native regex.
+_URN_PATTERN = r'[^a-zA-Z0-9_-]'
+_URN_RE = re.compile(_URN_PATTERN)
+
+_SYNONYMS_LABEL = "\n\n**Synonyms:** "
+_ACCEPTED_VALUES_LABEL = "\n\n**Accepted Values:**\n"
+
+
+# GLOSSARY_NAME and tag names repeat on every row, so cache the results.
+@lru_cache(maxsize=4096)
 def generate_urn(prefix, name):
-    clean_name = re.sub(r'[^a-zA-Z0-9_-]', '', str(name).replace(' ', ''))
+    clean_name = _URN_RE.sub('', str(name).replace(' ', ''))
     return f"urn:li:{prefix}:{clean_name}"
 
 
+def generate_urns(prefix, names):
+    # Vectorised generate_urn() over a whole column.
+    clean_names = (names.str.replace(' ', '', regex=False)
+                   .str.replace(_URN_PATTERN, '', regex=True))
+    return f"urn:li:{prefix}:" + clean_names
+
+
+def generate_dataset_urns(platform, urn_pattern, table_names):
+    # Vectorised form of the dataset URN built from *_URN_PATTERN.format(table_name=...).
+    prefix, _, suffix = urn_pattern.partition('{table_name}')
+    return (f"urn:li:dataset:(urn:li:dataPlatform:{platform},{prefix}"
+            + table_names + f"{suffix},{ENVIRONMENT})")
+
+
+def column_values(df, column_name):
+    # Empty cells come back as None (one vectorised pass), so the builders can
+    # test `is not None` instead of calling pd.notna() per value. Optional
+    # columns may be missing from the sheet; treat them as all-empty.
+    if column_name in df.columns:
+        return df[column_name].to_numpy(dtype=object, na_value=None)
+    return [None] * len(df)
+
+
+def clean_column_name(column_name):
+    # Excel headers carry spaces and '/', '#'; normalise them to identifiers.
+    return re.sub(r'\W+', '_', str(column_name)).strip('_')
+
+
 def create_main_glossary_node_mce():
     return {"auditHeader": None, "proposedSnapshot": {
         "com.linkedin.pegasus2avro.metadata.snapshot.GlossaryNodeSnapshot": {
@@ -45,36 +95,42 @@ def create_main_glossary_node_mce():
             "aspects": [{"com.linkedin.pegasus2avro.glossary.GlossaryNodeInfo": {"name": GLOSSARY_NAME}}]}}}
 
 
-def create_glossary_term_mce(row):
-    term_urn = generate_urn("glossaryTerm", row['Attribute/Column Name'])
-
+def create_glossary_term_mce(term_urn, full_name, definition, synonym, list_of_values,
+                             reference_link, jira_reference, originating_system):
     # --- Build a rich definition ---
+    # Sections are still separated by a newline, as the old "\n".join() did.
     definition_parts = []
-    if pd.notna(row.get('Definition')):
-        definition_parts.append(str(row['Definition']))
-    if pd.notna(row.get('Syonym')):
-        definition_parts.append(f"\n\n**Synonyms:** {row['Syonym']}")
-    if pd.notna(row.get('List of Values')):
-        definition_parts.append(f"\n\n**Accepted Values:**\n{row['List of Values']}")
+    if definition is not None:
+        definition_parts.append(definition)
+    if synonym is not None:
+        if definition_parts:
+            definition_parts.append("\n")
+        definition_parts.append(_SYNONYMS_LABEL)
+        definition_parts.append(synonym)
+    if list_of_values is not None:
+        if definition_parts:
+            definition_parts.append("\n")
+        definition_parts.append(_ACCEPTED_VALUES_LABEL)
+        definition_parts.append(list_of_values)
 
     # --- Build Links ---
     links = []
-    if pd.notna(row.get('Reference Link')):
-        links.append({"url": str(row['Reference Link']), "description": "Reference Link"})
-    if pd.notna(row.get('Jira Reference#')):
-        jira_url = f"{JIRA_URL_PREFIX}{row['Jira Reference#']}"
+    if reference_link is not None:
+        links.append({"url": reference_link, "description": "Reference Link"})
+    if jira_reference is not None:
+        jira_url = f"{JIRA_URL_PREFIX}{jira_reference}"
         links.append({"url": jira_url, "description": "Jira Ticket"})
 
     # --- Build Tags ---
     tags = []
-    if pd.notna(row.get('Originating System')):
-        tags.append({"tag": generate_urn("tag", f"Source:{row['Originating System']}")})
+    if originating_system is not None:
+        tags.append({"tag": generate_urn("tag", f"Source:{originating_system}")})
 
     # --- Assemble Aspects ---
     aspects = [
         {"com.linkedin.pegasus2avro.glossary.GlossaryTermInfo": {
-            "name": str(row['Full Name']),
-            "definition": "\n".join(definition_parts),
+            "name": full_name,
+            "definition": "".join(definition_parts),
             "parentNode": generate_urn("glossaryNode", GLOSSARY_NAME)
         }}
     ]
@@ -87,69 +143,76 @@ def create_glossary_term_mce(row):
         "com.linkedin.pegasus2avro.metadata.snapshot.GlossaryTermSnapshot": {"urn": term_urn, "aspects": aspects}}}
 
 
-def create_editable_schema_metadata_mce(dataset_urn, field_docs):
+def create_editable_schema_metadata_mce(dataset_urn, field_docs, created):
     return {"auditHeader": None, "proposedSnapshot": {
         "com.linkedin.pegasus2avro.metadata.snapshot.DatasetSnapshot": {"urn": dataset_urn, "aspects": [{
                                                                                                             "com.linkedin.pegasus2avro.schema.EditableSchemaMetadata": {
                                                                                                                 "editableSchemaFieldInfo": field_docs,
-                                                                                                                "created": {
-                                                                                                                    "time": int(
-                                                                                                                        time.time() * 1000),
-                                                                                                                    "actor": DATAHUB_ACTOR}}}]}}}
+                                                                                                                "created": created}}]}}}
+
+
+def generate_mces(df, now_ms):
+    yield create_main_glossary_node_mce()
+
+    # 1. Create one Glossary Term MCE per term; the first row for a URN wins
+    terms_df = df.drop_duplicates(subset='term_urn', keep='first')
+    term_columns = ['term_urn', 'Full_Name', 'Definition', 'Syonym', 'List_of_Values',
+                    'Reference_Link', 'Jira_Reference', 'Originating_System']
+    for values in zip(*(column_values(terms_df, c) for c in term_columns)):
+        yield create_glossary_term_mce(*values)
+
+    # 2. Collect the column docs for both datastores as one long frame of
+    #    (dataset_urn, fieldPath, term_urn) rows, then group by dataset
+    if 'physical_dictionary_table_name' not in df.columns:
+        return
+    has_table = df['physical_dictionary_table_name'].notna()
+    datastores = [
+        ('DataStore1_Attribute_Column_physical_name', DATASTORE1_PLATFORM, DATASTORE1_URN_PATTERN),
+        ('DataStore2_Column_Name', DATASTORE2_PLATFORM, DATASTORE2_URN_PATTERN),
+    ]
+    field_frames = []
+    for col_name, platform, urn_pattern in datastores:
+        if col_name not in df.columns:
+            continue
+        documented = df[has_table & df[col_name].notna()]
+        field_frames.append(pd.DataFrame({
+            'dataset_urn': generate_dataset_urns(platform, urn_pattern,
+                                                 documented['physical_dictionary_table_name']),
+            'fieldPath': documented[col_name],
+            'term_urn': documented['term_urn'],
+        }))
+    if not field_frames:
+        return
+
+    # One {"terms": [...]} per unique term, shared by every field doc tagged with it.
+    # These and the audit stamp never vary, so they are serialised once up front and
+    # spliced into the output as raw JSON.
+    term_refs = {term_urn: orjson.Fragment(orjson.dumps({"terms": [{"urn": term_urn}]}))
+                 for term_urn in terms_df['term_urn']}
+    created = orjson.Fragment(orjson.dumps({"time": now_ms, "actor": DATAHUB_ACTOR}))
+
+    # A stable sort on the original row index restores row order (DataStore1 before 2)
+    field_docs_df = pd.concat(field_frames).sort_index(kind='stable')
+    for dataset_urn, group in field_docs_df.groupby('dataset_urn', sort=False):
+        field_docs = [{"fieldPath": field_path, "glossaryTerms": term_refs[term_urn]}
+                      for field_path, term_urn in zip(group['fieldPath'], group['term_urn'])]
+        yield create_editable_schema_metadata_mce(dataset_urn, field_docs, created)
 
 
 def main():
-    all_mces = [create_main_glossary_node_mce()]
-    created_term_urns = set()
-
-    # This will hold all column docs, grouped by the final dataset URN
-    # e.g., {"urn:li:dataset...": [field_doc1, field_doc2]}
-    dataset_docs = {}
+    now_ms = int(time.time() * 1000)
 
     try:
-        df = pd.read_excel(EXCEL_FILE_PATH)  # Assuming one sheet now
-        for _, row in df.iterrows():
-            if not pd.notna(row.get('Attribute/Column Name')):
-                continue
-
-            # 1. Create the Glossary Term MCE (if not already created)
-            term_urn = generate_urn("glossaryTerm", row['Attribute/Column Name'])
-            if term_urn not in created_term_urns:
-                all_mces.append(create_glossary_term_mce(row))
-                created_term_urns.add(term_urn)
-
-            # --- Prepare documentation for both datastores ---
-            table_name = row.get('physical dictionary table_name')
-            if not pd.notna(table_name):
-                continue
-
-            # Handle DataStore 1
-            ds1_col_name = row.get('DataStore1 Attribute/Column physical_name')
-            if pd.notna(ds1_col_name):
-                ds1_urn = f"urn:li:dataset:(urn:li:dataPlatform:{DATASTORE1_PLATFORM},{DATASTORE1_URN_PATTERN.format(table_name=table_name)},{ENVIRONMENT})"
-                if ds1_urn not in dataset_docs:
-                    dataset_docs[ds1_urn] = []
-                dataset_docs[ds1_urn].append(
-                    {"fieldPath": str(ds1_col_name), "glossaryTerms": {"terms": [{"urn": term_urn}]}})
-
-            # Handle DataStore 2
-            ds2_col_name = row.get('DataStore2 Column Name')
-            if pd.notna(ds2_col_name):
-                ds2_urn = f"urn:li:dataset:(urn:li:dataPlatform:{DATASTORE2_PLATFORM},{DATASTORE2_URN_PATTERN.format(table_name=table_name)},{ENVIRONMENT})"
-                if ds2_urn not in dataset_docs:
-                    dataset_docs[ds2_urn] = []
-                dataset_docs[ds2_urn].append(
-                    {"fieldPath": str(ds2_col_name), "glossaryTerms": {"terms": [{"urn": term_urn}]}})
-
-        # 2. After processing all rows, create the MCEs for dataset documentation
-        for dataset_urn, field_docs in dataset_docs.items():
-            all_mces.append(create_editable_schema_metadata_mce(dataset_urn, field_docs))
-
-        # Write all MCEs to the output file
-        with open(OUTPUT_MCE_FILE, 'w') as f:
-            json.dump(all_mces, f, indent=2)
-
-        print(f"\nSuccessfully generated {len(all_mces)} MCEs in '{OUTPUT_MCE_FILE}'")
+        df = read_excel_cached(EXCEL_FILE_PATH, DICTIONARY_COLUMNS)  # Assuming one sheet now
+        df.columns = [clean_column_name(c) for c in df.columns]
+        df = df[df['Attribute_Column_Name'].notna()].reset_index(drop=True)
+        df['Full_Name'] = df['Full_Name'].fillna('')  # Keep <NA> out of the JSON
+        df['term_urn'] = generate_urns("glossaryTerm", df['Attribute_Column_Name'])
+
+        # Stream all MCEs to the output file
+        mce_count = write_mces(generate_mces(df, now_ms), OUTPUT_MCE_FILE)
+
+        print(f"\nSuccessfully generated {mce_count} MCEs in '{OUTPUT_MCE_FILE}'")
 
     except FileNotFoundError:
         print(f"Error: The file '{EXCEL_FILE_PATH}' was not found.")
@@ -0,0 +1,68 @@
+"""File helpers shared by create_glossary.py and create_glossary2.py."""
+from pathlib import Path
+
+import orjson
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Parquet schema metadata key that records what a cached frame was read from
+_CACHE_KEY = b'glossary_io.read_key'
+
+
+def read_excel_cached(path, columns, sheet_name=0):
+    """Reads the given columns of a sheet as Arrow-backed strings, caching them as Parquet.
+
+    The cache is <workbook>.<sheet>.parquet next to the workbook. It is reused
+    only while the key stored in its metadata still matches the workbook's size
+    and mtime_ns and the columns and dtypes requested; otherwise the sheet is
+    read again with the calamine engine and the cache overwritten. The cache is
+    optional: if it cannot be written the frame is still returned.
+    """
+    workbook = Path(path)
+    dtype = {c: 'string[pyarrow]' for c in columns}
+    stat = workbook.stat()
+    read_key = orjson.dumps({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                             "dtype": sorted(dtype.items())})
+    cache_path = workbook.with_name(f"{workbook.name}.{sheet_name}.parquet")
+
+    try:
+        if (pq.read_schema(cache_path).metadata or {}).get(_CACHE_KEY) == read_key:
+            return pd.read_parquet(cache_path)
+    except (OSError, pa.ArrowException):
+        pass  # Missing or unreadable cache; fall through and rebuild it
+
+    df = pd.read_excel(path, sheet_name=sheet_name, engine='calamine',
+                       usecols=lambda c: c in columns,  # Optional columns may be absent
+                       dtype=dtype)
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**table.schema.metadata, _CACHE_KEY: read_key})
+        pq.write_table(table, cache_path)
+    except (OSError, pa.ArrowException) as e:
+        print(f"Warning: could not write the Excel cache '{cache_path}': {e}")
+    return df
+
+
+def write_mces(mces, path):
+    """Streams MCEs to a JSON array file one at a time; returns the count written."""
+    count = 0
+    out = Path(path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    # Write next to the target and swap it in only once every MCE has been built,
+    # so a failure part-way leaves the previous output file intact.
+    tmp = out.with_name(f"{out.name}.tmp")
+    try:
+        with tmp.open('wb', buffering=1 << 20) as f:  # 1 MiB buffer, few write syscalls
+            f.write(b'[')
+            for mce in mces:
+                if count:
+                    f.write(b',\n')
+                f.write(orjson.dumps(mce))
+                count += 1
+            f.write(b']')
+        tmp.replace(out)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return count